@@ -1,89 +1,65 @@
 import streamlit as st
 import json
-from langchain.document_loaders.csv_loader import CSVLoader
-from langchain.vectorstores import FAISS
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
-from langchain.chains import LLMChain
+import logging
 import os
+import sys
 
-# Read API key
-api_key = st.secrets["api_key"]
-
-# 1. Vectorise the sales response csv data
 dir_path = os.path.dirname(os.path.realpath(__file__))
-csv_file_path = os.path.join(dir_path, 'books_qna.csv')
-loader = CSVLoader(file_path=csv_file_path)
-documents = loader.load()
-embeddings = OpenAIEmbeddings(openai_api_key=api_key)
-db = FAISS.from_documents(documents, embeddings)
-
-# 2. Function for similarity search
-
-def retrieve_info(query):
-    similar_response = db.similarity_search(query, k=3)
-
-    page_contents_array = [doc.page_content for doc in similar_response]
-
-    # print(page_contents_array)
-
-    return page_contents_array
-
+sys.path.append(os.path.dirname(dir_path))
+from ragcore.startup import STARTUP
 
-# 3. Setup LLMChain & prompts
-llm = ChatOpenAI(temperature=0.9, model="gpt-4-1106-preview", openai_api_key=api_key) #gpt-3.5-turbo-16k-0613
+# ragcore defers numpy, faiss, langchain and the OpenAI client until they are first needed
+with STARTUP.phase("imports"):
+    from ragcore.corpora import EXECUTHRIVE
+    from ragcore.service import RemoteRetrievalService, get_service
 
-# need to edit the template
-# Revised Prompt Template
-template = """
-As an executive management coach utilizing advanced AI tools, you are tasked to answer the following business-related question: {question}
 
-Your response should be informed by a blend of your extensive knowledge in business literature and the insights drawn from similar past queries. For each step in crafting your response, consider the following guidelines:
+logging.basicConfig(level=logging.INFO)
 
-1/ Utilize the insights derived from similar past queries provided by the AI-driven similarity search. Reflect on these insights to ensure your response is well-informed and contextually relevant from {past_answers}.
-
-2/ If the current query extends beyond the scope of these past insights, expand your response using general business principles and theories. Clearly indicate which parts of your response are based on these broader principles.
-
-3/ Continuously evaluate if additional searches are needed to enhance the quality of your response. If so, integrate new findings seamlessly into your existing knowledge base.
-
-4/ Ensure that your response is factual and data-driven, drawing upon the specific examples or teachings from past insights and general business knowledge.
-
-5/ In cases where new searches have been conducted, include a brief summary of these additional insights, demonstrating how they contribute to the comprehensiveness of your response.
-
-6/ In your final output, you should summarise the response to four to five paragraphs, and NOT mention that there was a search history.
-
-7/ In your final output, you should summarise the response to four to five paragraphs.
+# Read API key
+api_key = st.secrets["api_key"]
 
-Here is your well-researched, comprehensive, and contextually relevant answer to the question:
-"""
 
-prompt = PromptTemplate(
-    input_variables=["question", "past_answers"],
-    template=template
-)
+# 1. Connect to the shared retrieval service
+# The CSV, prompt template and LLM settings for this app live in ragcore/corpora.py. One
+# service per process holds the embeddings, FAISS indexes, LLM client and answer cache for
+# every corpus; set retrieval_service_url in secrets.toml to use a separately started
+# `python -m ragcore.service` instead.
+# Nothing heavy is built here: the embeddings, index and LLM client are warmed on a
+# background thread so the page renders straight away.
+@st.cache_resource
+def load_service():
+    service_url = st.secrets.get("retrieval_service_url")
+    if service_url:
+        return RemoteRetrievalService(service_url)
+    service = get_service(
+        api_key=api_key,
+        embeddings_config=st.secrets.get("embeddings"),
+        index_config=st.secrets.get("index"),
+    )
+    service.warm_async(EXECUTHRIVE.name)
+    return service
 
-chain = LLMChain(llm=llm, prompt=prompt)
 
+# 2. Function for similarity search
+def retrieve_info(query):
+    return load_service().retrieve(EXECUTHRIVE.name, query)
 
-# 4. Retrieval augmented generation
-def generate_response(question):
-    past_answers = retrieve_info(question)
-    response = chain.run(
-        question=question, 
-        past_answers=past_answers
-        )
-    return response
 
+# 3. Retrieval augmented generation
+def generate_response(question, on_token=None):
+    return load_service().generate(EXECUTHRIVE.name, question, on_token=on_token)
 
 
-# 5. Build an app with streamlit
+# 4. Build an app with streamlit
 
 def main():
     st.set_page_config(
         page_title="Executive Coach", page_icon=":anchor:")
 
     st.header("Executive Coach :anchor:")
+    STARTUP.mark("page rendered")
+    service = load_service()
 
     with st.sidebar:
         st.write("Question Guide")
@@ -93,7 +69,9 @@ def main():
             - **Organizational Culture**: *"How does aligning personal values with organizational culture create a more empathetic workplace?"*
             - **Leadership Challenges**: *"What strategies aid in handling leadership challenges and personal pressures like financial stress or relationships?"*
             """)
-        
+        with st.expander("Startup timing"):
+            st.json(STARTUP.summary())
+
     # adding in a history section
     if 'query_history' not in st.session_state:
         st.session_state['query_history'] = []
@@ -105,14 +83,19 @@ def main():
 
     if message:
         # Update the placeholder with the generating response message
-        status_message.write("Generating response...")
+        if not service.is_ready(EXECUTHRIVE.name):
+            status_message.write("Loading the knowledge base, this only happens once...")
+        else:
+            status_message.write("Generating response...")
 
-        result = generate_response(message)
+        # the answer box fills in token by token while the model is still generating
+        response_box = st.empty()
+        result = generate_response(message, on_token=lambda text: response_box.info(text + "▌"))
 
         # Once the response is generated, update the message
         status_message.write("Response Generated!")
 
-        st.info(result)
+        response_box.info(result)
         # save to history
         st.session_state['query_history'].append(message)
 
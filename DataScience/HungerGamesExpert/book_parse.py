@@ -2,6 +2,8 @@ import PyPDF2
 import json
 import requests
 
+from qna_dedup import NearDuplicateFilter, QnaCsvWriter
+
 url = "http://localhost:11434/api/generate"
 headers = {
     'Content-Type': 'application/json',
@@ -62,19 +64,40 @@ def submit_to_api(chunk, retries=3):
     return None
 
 
+def extract_qna(response):
+    data = response.get('data') if isinstance(response, dict) else None
+    if not isinstance(data, dict):
+        return None
+    question, answer = data.get('Question'), data.get('Answer')
+    if not isinstance(question, str) or not isinstance(answer, str):
+        return None
+    return question, answer
+
+
 def main():
     text = extract_text_from_pdf('thehungergames1.pdf')
     text_chunks = list(chunks(text, 2048))
 
-    for chunk in text_chunks:
-        response = submit_to_api(chunk)
-        if response is not None:
-            with open('responses.json', 'a') as f:
-                json.dump(response, f)
-                f.write('\n')
+    # Near-duplicate questions are dropped here, before they are embedded and indexed.
+    # training_data.csv is only replaced once every chunk has been processed
+    with QnaCsvWriter('training_data.csv', NearDuplicateFilter()) as writer:
+        try:
+            for chunk in text_chunks:
+                response = submit_to_api(chunk)
+                if response is not None:
+                    with open('responses.json', 'a') as f:
+                        json.dump(response, f)
+                        f.write('\n')
+
+                    qna = extract_qna(response)
+                    if qna is not None:
+                        writer.write(*qna)
+        finally:
+            print(writer.qna_filter.report())
 
 if __name__ == "__main__":
     try:
         main()  
     except KeyboardInterrupt:
-        print("\nScript interrupted. Partial data saved in 'responses.json'.")
+        print("\nScript interrupted. 'training_data.csv' is unchanged; partial data saved in "
+              "'responses.json' and 'training_data.csv.partial'.")
@@ -1,74 +1,64 @@
 import streamlit as st
 import json
-from langchain.document_loaders.csv_loader import CSVLoader
-from langchain.vectorstores import FAISS
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
-from langchain.chains import LLMChain
+import logging
 import os
+import sys
 
-
-# Read API key
-api_key = st.secrets["api_key"]
-
-# 1. Vectorise the sales response csv data
 dir_path = os.path.dirname(os.path.realpath(__file__))
-csv_file_path = os.path.join(dir_path, 'training_data.csv')
-loader = CSVLoader(file_path=csv_file_path)
-documents = loader.load()
-embeddings = OpenAIEmbeddings(openai_api_key=api_key)
-db = FAISS.from_documents(documents, embeddings)
-
-# 2. Function for similarity search
-
-def retrieve_info(query):
-    similar_response = db.similarity_search(query, k=3)
+sys.path.append(os.path.dirname(dir_path))
+from ragcore.startup import STARTUP
 
-    page_contents_array = [doc.page_content for doc in similar_response]
+# ragcore defers numpy, faiss, langchain and the OpenAI client until they are first needed
+with STARTUP.phase("imports"):
+    from ragcore.corpora import HUNGER_GAMES
+    from ragcore.service import RemoteRetrievalService, get_service
 
-    # print(page_contents_array)
 
-    return page_contents_array
+logging.basicConfig(level=logging.INFO)
 
+# Read API key
+api_key = st.secrets["api_key"]
 
-# 3. Setup LLMChain & prompts
-llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo-16k-0613", openai_api_key=api_key)
-
-# need to edit the template
-template = """
-You are an expert on "The Hunger Games".
-
-Below is a question about the book:
-{question}
-
-Based on the knowledge from the book and similar past questions and answers, provide a detailed and accurate answer:
-{past_answers}
 
-Here is the best answer to the question:
-"""
+# 1. Connect to the shared retrieval service
+# The CSV, prompt template and LLM settings for this app live in ragcore/corpora.py. One
+# service per process holds the embeddings, FAISS indexes, LLM client and answer cache for
+# every corpus; set retrieval_service_url in secrets.toml to use a separately started
+# `python -m ragcore.service` instead.
+# Nothing heavy is built here: the embeddings, index and LLM client are warmed on a
+# background thread so the page renders straight away.
+@st.cache_resource
+def load_service():
+    service_url = st.secrets.get("retrieval_service_url")
+    if service_url:
+        return RemoteRetrievalService(service_url)
+    service = get_service(
+        api_key=api_key,
+        embeddings_config=st.secrets.get("embeddings"),
+        index_config=st.secrets.get("index"),
+    )
+    service.warm_async(HUNGER_GAMES.name)
+    return service
 
-prompt = PromptTemplate(
-    input_variables=["question", "past_answers"],
-    template=template
-)
 
-chain = LLMChain(llm=llm, prompt=prompt)
+# 2. Function for similarity search
+def retrieve_info(query):
+    return load_service().retrieve(HUNGER_GAMES.name, query)
 
 
-# 4. Retrieval augmented generation
-def generate_response(question):
-    past_answers = retrieve_info(question)
-    response = chain.run(question=question, past_answers=past_answers)
-    return response
+# 3. Retrieval augmented generation
+def generate_response(question, on_token=None):
+    return load_service().generate(HUNGER_GAMES.name, question, on_token=on_token)
 
 
-# 5. Build an app with streamlit
+# 4. Build an app with streamlit
 def main():
     st.set_page_config(
         page_title="Hunger Games Expert", page_icon=":bird:")
 
     st.header("Hunger Games Quiz Expert :bird:")
+    STARTUP.mark("page rendered")
+    service = load_service()
 
     with st.sidebar:
         st.write("Question Guide")
@@ -78,18 +68,24 @@ def main():
             - Explore settings and world-building details
             - Seek explanations for specific events in the story
             """)
-        
+        with st.expander("Startup timing"):
+            st.json(STARTUP.summary())
+
     # adding in a history section
     if 'query_history' not in st.session_state:
         st.session_state['query_history'] = []
 
     message = st.text_area("Please type your question on Hunger Games below!")
     if message:
+        if not service.is_ready(HUNGER_GAMES.name):
+            st.write("Loading the knowledge base, this only happens once...")
         st.write("Generating response...")
 
-        result = generate_response(message)
+        # the answer box fills in token by token while the model is still generating
+        response_box = st.empty()
+        result = generate_response(message, on_token=lambda text: response_box.info(text + "▌"))
 
-        st.info(result)
+        response_box.info(result)
         # save to history
         st.session_state['query_history'].append(message)
 
@@ -0,0 +1,148 @@
+import argparse
+import csv
+import hashlib
+import os
+import re
+
+import numpy as np
+
+# Smallest prime above 2**32, so (a * h + b) stays inside uint64 for 32-bit hashes
+_PRIME = np.uint64(4294967311)
+_MAX_HASH = 2 ** 32
+
+CSV_FIELDS = ["Question", "Answer"]
+
+
+def _normalise(text):
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+def _shingles(text, size):
+    text = _normalise(text)
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _hash32(shingle):
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little")
+
+
+class NearDuplicateFilter:
+    """MinHash/LSH filter that keeps the first of each group of near-identical questions.
+
+    Questions are compared on character shingles; a new question is dropped when its
+    estimated Jaccard similarity to an already kept question reaches `threshold`.
+    """
+
+    def __init__(self, threshold=0.7, num_perm=128, bands=32, shingle_size=5, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+        self._signatures = []
+        self._buckets = [{} for _ in range(bands)]
+        self.kept = 0
+        self.removed = 0
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (_hash32(s) for s in _shingles(text, self.shingle_size)), dtype=np.uint64
+        )
+        return ((hashes[:, None] * self._a + self._b) % _PRIME).min(axis=0)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def is_duplicate(self, signature):
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+        return any(
+            np.mean(self._signatures[i] == signature) >= self.threshold
+            for i in candidates
+        )
+
+    def add(self, question):
+        """Returns True if the question is new and was kept, False if it was a near-duplicate."""
+        signature = self.signature(question)
+        if self.is_duplicate(signature):
+            self.removed += 1
+            return False
+
+        row_id = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in self._band_keys(signature):
+            self._buckets[band].setdefault(key, []).append(row_id)
+        self.kept += 1
+        return True
+
+    def report(self):
+        return f"{self.kept} rows kept, {self.removed} near-duplicate rows removed."
+
+
+class QnaCsvWriter:
+    """Writes de-duplicated rows in the training_data.csv format as they arrive.
+
+    Rows go to `<file_path>.partial`, which only replaces file_path when the writer is
+    closed without an error, so an existing CSV is never truncated by a run that fails
+    or is interrupted part way.
+    """
+
+    def __init__(self, file_path, qna_filter=None):
+        self.qna_filter = qna_filter or NearDuplicateFilter()
+        self.file_path = file_path
+        self.partial_path = file_path + ".partial"
+        self._file = open(self.partial_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_FIELDS)
+
+    def write(self, question, answer):
+        question, answer = question.strip(), answer.strip()
+        if not question or not answer or not self.qna_filter.add(question):
+            return False
+        self._writer.writerow([question, answer])
+        # flush per row so an interrupted run still leaves a usable partial CSV
+        self._file.flush()
+        return True
+
+    def close(self, commit=True):
+        self._file.close()
+        if commit:
+            os.replace(self.partial_path, self.file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(commit=exc_type is None)
+
+
+def dedup_csv(input_path, output_path, threshold=0.7):
+    with open(input_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    with QnaCsvWriter(output_path, NearDuplicateFilter(threshold=threshold)) as writer:
+        for row in rows:
+            writer.write(row["Question"], row["Answer"])
+    return writer.qna_filter
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove near-duplicate questions from a Q&A CSV.")
+    parser.add_argument("input", help="CSV with Question and Answer columns")
+    parser.add_argument("output", help="where to write the cleaned CSV")
+    parser.add_argument("--threshold", type=float, default=0.7,
+                        help="estimated Jaccard similarity at which rows count as duplicates")
+    args = parser.parse_args()
+
+    print(dedup_csv(args.input, args.output, args.threshold).report())
@@ -1,35 +1,67 @@
-from IPython.display import display, Audio
-from PIL import Image
-from moviepy.editor import VideoFileClip, AudioFileClip
-from moviepy.audio.io.AudioFileClip import AudioFileClip
-import cv2 # read video with open CV
-import base64, io, openai, os, requests, streamlit as st, tempfile, json
+import logging, openai, os, streamlit as st, time
+from functools import partial
+from frames import (PAYLOAD_BUDGET_BYTES, TARGET_SIDE, default_workers, encode_windows, probe_video,
+                    read_frames_parallel, resize_frame, sample_indices)
+from keyframes import keyframe_indices
+from video_cache import VideoCache, cleanup_stale_videos, temporary_video, video_hash
+from windowed import windowed_story
+
+logging.basicConfig(level=logging.INFO)
 
 # read in api_key
 openai.api_key = st.secrets["api_key"]
+# point at a local OpenAI-compatible stand-in for testing, e.g. http://localhost:8000/v1
+if st.secrets.get("openai_base_url"):
+    openai.base_url = st.secrets["openai_base_url"]
 
-# Step 1: Turn video into frames
+VISION_MODEL = "gpt-4-vision-preview"
+# Windows of a long video analysed at the same time
+WINDOW_CONCURRENCY = 4
 
-def video_to_frames(video_file):
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmpfile:
-        tmpfile.write(video_file.read())
-        video_filename = tmpfile.name
-    
-    video_duration = VideoFileClip(video_filename).duration
-
-    video = cv2.VideoCapture(video_filename)
-    base64Frames = []
-
-    while video.isOpened():
-        success, frame = video.read()
-        if not success:
-            break
-        _, buffer = cv2.imencode(".jpg", frame)
-        base64Frames.append(base64.b64encode(buffer).decode("utf-8"))
-    
-    video.release()
-    print(len(base64Frames), 'frames red for analysis.')
-    return base64Frames, video_filename, video_duration
+# Sampled frames and reports are cached next to the app, keyed by the video's content hash
+dir_path = os.path.dirname(os.path.realpath(__file__))
+cache = VideoCache(os.path.join(dir_path, ".video_cache"))
+
+# Step 1: Turn video into frames
+# Only the frames that will be sent are decoded and encoded. With a keyframe budget the
+# frames are picked by scene changes; otherwise every `stride`-th frame is sent, or
+# `max_frames` evenly spaced frames when a target count is given.
+# Long videos are decoded in parallel segments, one process per core (see frames.py).
+# Frames are downscaled to `max_side` locally and JPEG-encoded to fit `payload_budget` bytes.
+# With `window_seconds` the keyframe and payload budgets apply to each window of the video,
+# and sampling["windows"] says which frames belong to which window
+
+def video_to_frames(video_file, stride=132, max_frames=None, keyframe_budget=None, workers=None,
+                    max_side=TARGET_SIDE, payload_budget=PAYLOAD_BUDGET_BYTES, window_seconds=None):
+    data = video_file.getvalue()
+    video_key = video_hash(data)
+    params = {"stride": stride, "max_frames": max_frames, "keyframe_budget": keyframe_budget,
+              "max_side": max_side, "payload_budget": payload_budget, "window_seconds": window_seconds}
+
+    cached = cache.get_frames(video_key, params)
+    if cached is not None:
+        print(cached["sampling"]["sent"], 'frames loaded from cache.')
+        return cached["frames"], cached["duration"], cached["sampling"], video_key
+
+    with temporary_video(data) as video_filename:
+        info = probe_video(video_filename)
+        video_duration = info["duration"]
+        workers = workers or default_workers(info)
+
+        if keyframe_budget:
+            indices, sampled = keyframe_indices(video_filename, info, budget=keyframe_budget, workers=workers,
+                                                window_seconds=window_seconds)
+        else:
+            indices = sample_indices(info["frame_count"], stride=stride, target_count=max_frames)
+            sampled = len(indices)
+        frames = read_frames_parallel(video_filename, indices, partial(resize_frame, max_side=max_side), workers)
+    base64Frames, windows, payload = encode_windows(frames, info["fps"], window_seconds, budget_bytes=payload_budget)
+
+    sampling = {"frames": info["frame_count"], "sampled": sampled, "sent": len(base64Frames), "windows": windows,
+                **payload}
+    print(sampling["sent"], 'frames sent of', sampled, 'sampled from', info["frame_count"], 'frames.')
+    cache.put_frames(video_key, params, {"frames": base64Frames, "duration": video_duration, "sampling": sampling})
+    return base64Frames, video_duration, sampling, video_key
 
 # Step 2: Generate stories based on frames with GPT4 Turbo
 # one second = 24 frames
@@ -40,18 +72,20 @@ def frames_to_story(base64Frames, prompt):
             "role": "user",
             "content": [
                 prompt,
-                *map(lambda x: {"image": x, "resize": 768},
-                     base64Frames[0::132]),
+                # frames are already downscaled locally, see video_to_frames
+                *map(lambda x: {"image": x}, base64Frames),
             ],
         },
     ]
     params = {
-        "model": "gpt-4-vision-preview",
+        "model": VISION_MODEL,
         "messages": PROMPT_MESSAGES,
         "max_tokens": 1000,
     }
 
+    started = time.perf_counter()
     result = openai.chat.completions.create(**params)
+    print(f"Report generated in {time.perf_counter() - started:.1f}s")
     print(result.choices[0].message.content)
     return result.choices[0].message.content
 
@@ -59,6 +93,7 @@ def frames_to_story(base64Frames, prompt):
 ## Streamlit UI
 def main():
     st.set_page_config(page_title="Short Form Video Analyser", page_icon=":tv:")
+    cleanup_stale_videos()
 
     st.header("Short Form Video Analyser")
 
@@ -93,15 +128,38 @@ def main():
                   "the elements being used to maximise engagement.",
             height=300
         )
+        keyframe_budget = st.slider(
+            "Max frames to send (picked by scene changes, 0 for a fixed interval)",
+            min_value=0, max_value=50, value=20
+        )
+        window_seconds = st.number_input(
+            "Analyse long videos in windows of this many seconds (0 for a single request)",
+            min_value=0, max_value=600, value=60, step=10
+        )
 
     if st.button('Click for Report', type="primary") and uploaded_file is not None:
         with st.spinner("Processing Video..."):
-            base64Frames, video_filename, video_duration = video_to_frames(
-                uploaded_file
+            base64Frames, video_duration, sampling, video_key = video_to_frames(
+                uploaded_file, keyframe_budget=keyframe_budget, window_seconds=window_seconds or None
             )
-
-            # Generate the story/report from frames
-            report = frames_to_story(base64Frames, prompt)
+            windows = [window for window in sampling["windows"] if window["frames"]]
+            st.caption(f"Sent {sampling['sent']} of {sampling['sampled']} sampled frames "
+                       f"({sampling['frames']} frames in the video), "
+                       f"{sampling['payload_bytes'] / 1024:.0f} KB at JPEG quality {sampling['jpeg_quality']}")
+
+            # Generate the story/report from frames, unless this video and prompt were just analysed.
+            # Videos spanning several windows are analysed window by window and the notes merged
+            settings = {"keyframe_budget": keyframe_budget, "window_seconds": window_seconds}
+            report = cache.get_report(video_key, prompt, VISION_MODEL, settings)
+            if report is None:
+                if len(windows) > 1:
+                    st.caption(f"Analysing {len(windows)} windows of {window_seconds}s, "
+                               f"{WINDOW_CONCURRENCY} at a time")
+                    report, _ = windowed_story(openai, VISION_MODEL, prompt, base64Frames, sampling["windows"],
+                                               video_duration, max_workers=WINDOW_CONCURRENCY)
+                else:
+                    report = frames_to_story(base64Frames, prompt)
+                cache.put_report(video_key, prompt, VISION_MODEL, report, settings)
 
             # Display the generated report
             st.subheader("Generated Report")
@@ -0,0 +1,209 @@
+import base64
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, repeat
+from operator import itemgetter
+
+import cv2
+import numpy as np
+
+# Beyond this many frames it is cheaper to seek than to grab() through the gap
+SEEK_THRESHOLD = 48
+# Videos at least this long are decoded in parallel segments by default
+PARALLEL_MIN_SECONDS = 120
+MAX_WORKERS = 8
+
+# Frames are sent at this size (longest side) instead of letting the API downscale them
+TARGET_SIDE = 768
+JPEG_QUALITY = 80
+MIN_JPEG_QUALITY = 40
+# Total base64 bytes of images in one request
+PAYLOAD_BUDGET_BYTES = 3_000_000
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def probe_video(video_filename):
+    video = cv2.VideoCapture(video_filename)
+    fps = video.get(cv2.CAP_PROP_FPS) or 24.0
+    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    info = {
+        "fps": fps,
+        "frame_count": frame_count,
+        "width": int(video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "duration": frame_count / fps if fps else 0.0,
+    }
+    video.release()
+    return info
+
+
+def sample_indices(frame_count, stride=132, target_count=None):
+    """Frame numbers to send: every `stride`-th frame, or `target_count` evenly spaced frames."""
+    if frame_count <= 0:
+        return []
+    if target_count:
+        return sorted({int(i) for i in np.linspace(0, frame_count - 1, num=min(target_count, frame_count))})
+    return list(range(0, frame_count, max(1, stride)))
+
+
+def read_frames(video_filename, indices, seek_threshold=SEEK_THRESHOLD):
+    """Yields (index, frame) for the requested frame numbers only.
+
+    Short gaps are skipped with grab(), which does not convert or copy the frame; long
+    gaps seek straight to the next wanted frame.
+    """
+    video = cv2.VideoCapture(video_filename)
+    position = 0
+    try:
+        for index in sorted(indices):
+            if index - position > seek_threshold:
+                video.set(cv2.CAP_PROP_POS_FRAMES, index)
+                position = index
+            while position < index and video.grab():
+                position += 1
+            success, frame = video.read()
+            if not success:
+                # CAP_PROP_FRAME_COUNT is an estimate for some containers
+                break
+            position += 1
+            yield index, frame
+    finally:
+        video.release()
+
+
+def resize_frame(frame, max_side=TARGET_SIDE):
+    height, width = frame.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def encode_frame(frame, quality=JPEG_QUALITY):
+    _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return base64.b64encode(buffer).decode("utf-8")
+
+
+def encode_frames(frames, budget_bytes=PAYLOAD_BUDGET_BYTES, quality=JPEG_QUALITY, min_quality=MIN_JPEG_QUALITY):
+    """Encodes frames to base64 JPEGs that add up to at most budget_bytes.
+
+    JPEG quality is lowered in steps of 10 down to min_quality first; if the payload is
+    still too big, frames are dropped evenly across the video until it fits.
+    Returns the encoded frames and a dict of payload stats.
+    """
+    started = time.perf_counter()
+    while True:
+        encoded = [encode_frame(frame, quality) for frame in frames]
+        total = sum(map(len, encoded))
+        if total <= budget_bytes or quality <= min_quality:
+            break
+        quality = max(min_quality, quality - 10)
+
+    sent = encoded
+    while total > budget_bytes and len(sent) > 1:
+        keep = min(len(sent) - 1, max(1, int(len(sent) * budget_bytes / total)))
+        sent = [encoded[i] for i in sample_indices(len(encoded), target_count=keep)]
+        total = sum(map(len, sent))
+
+    stats = {
+        "payload_bytes": total,
+        "jpeg_quality": quality,
+        "dropped": len(encoded) - len(sent),
+        "encode_seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info("Encoded %d frames: %.0f KB at JPEG quality %d in %.2fs (%d dropped for the %d KB budget)",
+                len(sent), total / 1024, quality, stats["encode_seconds"], stats["dropped"], budget_bytes // 1024)
+    return sent, stats
+
+
+def window_number(index, fps, window_seconds=None):
+    """Which window of `window_seconds` frame `index` falls in; 0 when there are no windows.
+    Keyframe selection and encoding both use this, so they always agree at fractional fps."""
+    if not window_seconds:
+        return 0
+    return int(index / fps // window_seconds)
+
+
+def encode_windows(frames, fps, window_seconds=None, budget_bytes=PAYLOAD_BUDGET_BYTES):
+    """Encodes (index, frame) pairs window by window, each window within budget_bytes.
+
+    Returns the encoded frames in time order, a list of {"start", "end", "frames"} dicts
+    telling which consecutive run of them belongs to which window (in seconds), and
+    payload stats summed over the windows. Without window_seconds everything is one window.
+    """
+    groups = {}
+    for index, frame in frames:
+        groups.setdefault(window_number(index, fps, window_seconds), []).append(frame)
+
+    encoded, windows = [], []
+    stats = {"payload_bytes": 0, "jpeg_quality": JPEG_QUALITY, "dropped": 0, "encode_seconds": 0.0}
+    for number, group in sorted(groups.items()):
+        sent, window_stats = encode_frames(group, budget_bytes=budget_bytes)
+        encoded += sent
+        start = number * window_seconds if window_seconds else 0
+        windows.append({"start": start, "end": start + window_seconds if window_seconds else None, "frames": len(sent)})
+        stats["payload_bytes"] += window_stats["payload_bytes"]
+        stats["jpeg_quality"] = min(stats["jpeg_quality"], window_stats["jpeg_quality"])
+        stats["dropped"] += window_stats["dropped"]
+        stats["encode_seconds"] = round(stats["encode_seconds"] + window_stats["encode_seconds"], 3)
+    return encoded, windows, stats
+
+
+def _read_segment(video_filename, indices, transform):
+    return [(index, transform(frame)) for index, frame in read_frames(video_filename, indices)]
+
+
+def default_workers(info):
+    if info["duration"] < PARALLEL_MIN_SECONDS:
+        return 1
+    return min(os.cpu_count() or 1, MAX_WORKERS)
+
+
+def get_pool():
+    """Returns the process-wide decode pool, creating it on first call.
+
+    Workers are started with spawn rather than fork: this runs inside the multithreaded
+    Streamlit server, and forking a threaded process (with OpenCV already loaded) can
+    deadlock the children. Spawned workers are slow to start, so the pool is kept for
+    the life of the process instead of being created per video.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, MAX_WORKERS),
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def read_frames_parallel(video_filename, indices, transform, workers=None):
+    """Returns [(index, transform(frame))] in frame order.
+
+    The frame numbers are split into contiguous segments, one per worker process; each
+    worker opens its own capture and seeks to the start of its segment. transform runs in
+    the worker too, so it must be a module level function (e.g. resize_frame).
+    """
+    global _pool
+    workers = workers or min(os.cpu_count() or 1, MAX_WORKERS)
+    segments = [[int(i) for i in segment] for segment in np.array_split(sorted(indices), workers) if len(segment)]
+    if len(segments) <= 1:
+        return _read_segment(video_filename, indices, transform)
+
+    pool = get_pool()
+    try:
+        results = pool.map(_read_segment, repeat(video_filename), segments, repeat(transform))
+        return sorted(chain.from_iterable(results), key=itemgetter(0))
+    except BrokenProcessPool:
+        # a worker died (e.g. killed for memory); start a fresh pool on the next call
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
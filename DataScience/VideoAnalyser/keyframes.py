@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+
+from frames import read_frames_parallel, sample_indices, window_number
+
+THUMBNAIL_SIZE = (32, 32)
+LAYOUT_SIZE = (8, 8)
+
+
+def thumbnail(frame):
+    return cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def frame_signatures(thumbnails):
+    """Per-frame signatures for a stack of BGR thumbnails, shape (n, h, w, 3).
+
+    Each signature is a 64-bin colour histogram (4 levels per channel) next to an 8x8
+    grayscale layout, scaled so the L1 distance between two signatures lies in [0, 1]:
+    half from the palette and half from where things are in the frame.
+    """
+    thumbnails = np.asarray(thumbnails, dtype=np.uint8)
+    n, h, w, _ = thumbnails.shape
+
+    levels = (thumbnails >> 6).astype(np.int64)
+    codes = levels[..., 0] * 16 + levels[..., 1] * 4 + levels[..., 2]
+    offsets = np.arange(n)[:, None] * 64
+    hist = np.bincount((codes.reshape(n, -1) + offsets).ravel(), minlength=n * 64).reshape(n, 64) / (h * w)
+
+    gray = thumbnails.astype(np.float32) @ np.array([0.114, 0.587, 0.299], dtype=np.float32)
+    lh, lw = LAYOUT_SIZE
+    layout = gray.reshape(n, lh, h // lh, lw, w // lw).mean(axis=(2, 4)).reshape(n, -1)
+
+    return np.hstack([hist * 0.25, layout / (255 * lh * lw * 2)]).astype(np.float32)
+
+
+def select_keyframes(signatures, budget, min_distance=0.05):
+    """Greedy farthest-point selection: starts from the first frame and keeps adding the frame
+    least like anything already chosen, until the budget is used or every remaining frame is
+    within min_distance of a chosen one. Returns positions in time order."""
+    if len(signatures) == 0 or budget <= 0:
+        return []
+    selected = [0]
+    nearest = np.abs(signatures - signatures[0]).sum(axis=1)
+    while len(selected) < budget:
+        candidate = int(nearest.argmax())
+        if nearest[candidate] < min_distance:
+            break
+        selected.append(candidate)
+        nearest = np.minimum(nearest, np.abs(signatures - signatures[candidate]).sum(axis=1))
+    return sorted(selected)
+
+
+def keyframe_indices(video_filename, info, budget=20, candidates_per_second=2, max_candidates=600,
+                     min_distance=0.05, workers=1, window_seconds=None):
+    """Picks up to `budget` distinct frame numbers from the video, or from each window of
+    `window_seconds` when one is given.
+
+    Candidates are read at `candidates_per_second` (at most `max_candidates` of them) and
+    only their thumbnails are kept, so the full-size frames still have to be read again for
+    the frames that are picked.
+    """
+    stride = max(1, round(info["fps"] / candidates_per_second))
+    candidates = sample_indices(info["frame_count"], stride=stride)
+    if len(candidates) > max_candidates:
+        candidates = sample_indices(info["frame_count"], target_count=max_candidates)
+
+    thumbnails = read_frames_parallel(video_filename, candidates, thumbnail, workers)
+    if not thumbnails:
+        return [], 0
+    read = np.array([index for index, _ in thumbnails])
+    signatures = frame_signatures(np.stack([small for _, small in thumbnails]))
+
+    windows = np.array([window_number(index, info["fps"], window_seconds) for index in read])
+    picked = []
+    for window in np.unique(windows):
+        positions = np.flatnonzero(windows == window)
+        picked += [int(read[positions[i]]) for i in select_keyframes(signatures[positions], budget, min_distance)]
+    return picked, len(read)
@@ -0,0 +1,35 @@
+import logging
+import random
+import time
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Rate limits and transient API errors; anything else (bad request, auth) is raised straight away
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                    openai.InternalServerError)
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def with_backoff(fn, max_retries=6, base_delay=1.0, max_delay=60.0):
+    """Calls fn, retrying rate limit and transient API errors with exponential backoff and jitter.
+    A Retry-After header from the API takes precedence over the computed delay."""
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = _retry_after(e) or min(max_delay, base_delay * 2 ** attempt) * (0.5 + random.random())
+            logger.warning("%s, retrying in %.1fs (attempt %d/%d)", type(e).__name__, delay,
+                           attempt + 1, max_retries)
+            time.sleep(delay)
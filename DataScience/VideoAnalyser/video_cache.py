@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TEMP_PREFIX = "videoanalyser-"
+MAX_CACHE_BYTES = 500 * 1024 * 1024
+
+
+def video_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def temporary_video(data, suffix=".mp4"):
+    """Writes the upload to a temp file for OpenCV and removes it again on exit."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix=TEMP_PREFIX) as tmpfile:
+        tmpfile.write(data)
+    try:
+        yield tmpfile.name
+    finally:
+        os.remove(tmpfile.name)
+
+
+def cleanup_stale_videos(max_age_seconds=3600):
+    """Removes temp videos left behind by runs that were killed mid-decode."""
+    tmp_dir = tempfile.gettempdir()
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(tmp_dir):
+        path = os.path.join(tmp_dir, name)
+        try:
+            if name.startswith(TEMP_PREFIX) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+class VideoCache:
+    """On-disk cache of sampled frames and generated reports.
+
+    Frames are keyed by the video content hash and the sampling parameters, reports by
+    the video hash, prompt and model (plus any settings that change the report, such as
+    the analysis windows). Entries are JSON files; once the cache grows past
+    max_bytes the least recently used ones are deleted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def get_frames(self, video_key, params):
+        return self._get("frames", _key(video_key, params))
+
+    def put_frames(self, video_key, params, value):
+        self._put("frames", _key(video_key, params), value)
+
+    def get_report(self, video_key, prompt, model, settings=None):
+        entry = self._get("reports", _key(video_key, prompt, model, settings))
+        return entry["report"] if entry else None
+
+    def put_report(self, video_key, prompt, model, report, settings=None):
+        self._put("reports", _key(video_key, prompt, model, settings), {"report": report})
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, key + ".json")
+
+    def _get(self, kind, key):
+        path = self._path(kind, key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+            # mtime doubles as last-used time for eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def _put(self, kind, key, value):
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Streamlit sessions are threads of one process, so every write needs its own temp file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for kind in ("frames", "reports"):
+            folder = os.path.join(self.cache_dir, kind)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if not name.endswith(".json"):
+                    # temp files of writes still in progress
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                logger.info("Evicted %s from the video cache", os.path.basename(path))
+            except OSError:
+                pass
@@ -0,0 +1,62 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from retry import with_backoff
+
+logger = logging.getLogger(__name__)
+
+WINDOW_PROMPT = (
+    "These frames are from {start} to {end} of a {duration} video; the other parts are "
+    "analysed separately. Write concise notes on this part only (what is shown, text on "
+    "screen, edits and pacing), with timestamps where useful, for someone who will write "
+    "the final report below.\n\nFinal report task:\n{prompt}"
+)
+
+REDUCE_PROMPT = (
+    "Below are notes on consecutive parts of one {duration} video, in order. Using them, "
+    "complete the task. Treat the notes as one video, not separate clips.\n\n"
+    "Task:\n{prompt}\n\nNotes:\n{notes}"
+)
+
+
+def format_time(seconds):
+    return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
+
+
+def analyse_window(client, model, prompt, frames, start, end, duration, max_tokens=500):
+    content = WINDOW_PROMPT.format(start=format_time(start), end=format_time(end),
+                                   duration=format_time(duration), prompt=prompt)
+    messages = [{"role": "user", "content": [content, *map(lambda x: {"image": x}, frames)]}]
+    result = with_backoff(lambda: client.chat.completions.create(model=model, messages=messages, max_tokens=max_tokens))
+    return result.choices[0].message.content
+
+
+def windowed_story(client, model, prompt, base64Frames, windows, duration, max_workers=4, max_tokens=1000):
+    """Map-reduce report for long videos.
+
+    Each window's frames are analysed in their own request, at most max_workers at a time,
+    and the per-window notes are then merged into the final report with a text-only request.
+    Returns the report and the list of window notes.
+    """
+    jobs, offset = [], 0
+    for window in windows:
+        if window["frames"]:
+            jobs.append((base64Frames[offset:offset + window["frames"]], window["start"],
+                         min(window["end"] or duration, duration)))
+        offset += window["frames"]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        notes = list(pool.map(
+            lambda job: analyse_window(client, model, prompt, job[0], job[1], job[2], duration), jobs
+        ))
+    logger.info("Analysed %d windows in %.1fs", len(jobs), time.perf_counter() - started)
+
+    sections = "\n\n".join(
+        f"[{format_time(start)} - {format_time(end)}]\n{note}" for (_, start, end), note in zip(jobs, notes)
+    )
+    messages = [{"role": "user", "content": REDUCE_PROMPT.format(duration=format_time(duration), prompt=prompt,
+                                                                  notes=sections)}]
+    result = with_backoff(lambda: client.chat.completions.create(model=model, messages=messages, max_tokens=max_tokens))
+    return result.choices[0].message.content, notes
@@ -0,0 +1 @@
+"""Shared retrieval helpers for the RAG Streamlit apps (HungerGamesExpert, ExecuThrive)."""
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def template_key(template):
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """In-process cache of generated answers, looked up by query embedding similarity.
+
+    Entries live in per-app namespaces and only match when the prompt template is the same
+    one that produced them. Each namespace is an LRU capped at max_entries, and entries
+    older than ttl_seconds are dropped.
+    """
+
+    def __init__(self, threshold=0.95, max_entries=512, ttl_seconds=24 * 60 * 60):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._namespaces = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entries(self, namespace):
+        return self._namespaces.setdefault(namespace, OrderedDict())
+
+    def _expire(self, entries, now):
+        stale = [key for key, entry in entries.items() if now - entry["created"] > self.ttl_seconds]
+        for key in stale:
+            del entries[key]
+
+    def lookup(self, namespace, query_vector, template):
+        """Returns the stored answer for the most similar previous question, or None."""
+        prompt = template_key(template)
+        query = _unit(query_vector)
+        with self._lock:
+            entries = self._entries(namespace)
+            self._expire(entries, time.time())
+            candidates = [key for key, entry in entries.items() if entry["template"] == prompt]
+            if candidates:
+                matrix = np.stack([entries[key]["vector"] for key in candidates])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = candidates[best]
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    return entries[key]["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, namespace, query_vector, template, question, answer):
+        with self._lock:
+            entries = self._entries(namespace)
+            entries[self._next_id] = {
+                "vector": _unit(query_vector),
+                "template": template_key(template),
+                "question": question,
+                "answer": answer,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def clear(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._namespaces.clear()
+            else:
+                self._namespaces.pop(namespace, None)
@@ -0,0 +1,173 @@
+"""Batch question answering for the app corpora.
+
+Reads a CSV of questions and appends answers to an output CSV as they complete. Rerunning
+with the same output file resumes: rows that already have an answer are skipped, and rows
+that failed are dropped from the file and asked again. Every question goes to the LLM; the
+semantic answer cache is only used with --use-answer-cache. Run from the DataScience/
+folder, e.g.
+
+    OPENAI_API_KEY=... python -m ragcore.batch --corpus hunger_games --input questions.csv --output answers.csv
+"""
+import argparse
+import csv
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ragcore.corpora import CORPORA
+from ragcore.service import RetrievalService
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FIELDS = ["id", "question", "answer", "error"]
+
+
+def _retryable_errors():
+    try:
+        import openai
+    except ImportError:
+        return ()
+    return tuple(
+        getattr(openai, name)
+        for name in ("RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError")
+        if hasattr(openai, name)
+    )
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def with_backoff(fn, max_retries=6, base_delay=1.0, max_delay=60.0):
+    """Calls fn, retrying rate limit and transient API errors with exponential backoff and jitter.
+    A Retry-After header from the API takes precedence over the computed delay."""
+    retryable = _retryable_errors()
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except retryable as e:
+            if attempt == max_retries:
+                raise
+            delay = _retry_after(e) or min(max_delay, base_delay * 2 ** attempt) * (0.5 + random.random())
+            logger.warning("%s, retrying in %.1fs (attempt %d/%d)", type(e).__name__, delay,
+                           attempt + 1, max_retries)
+            time.sleep(delay)
+
+
+def read_questions(input_path, question_column="Question", id_column=None):
+    with open(input_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return [
+        (row[id_column] if id_column else str(i), row[question_column].strip())
+        for i, row in enumerate(rows)
+        if row.get(question_column, "").strip()
+    ]
+
+
+def compact_output(output_path):
+    """Rewrites the output keeping one answered row per id (the last one wins) and dropping
+    failed rows, so they are retried without leaving duplicates. Returns the answered ids."""
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    answered = {}
+    for row in rows:
+        if row.get("answer") and not row.get("error"):
+            answered[row["id"]] = row
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(answered.values())
+    os.replace(tmp_path, output_path)
+    return set(answered)
+
+
+def open_output(output_path):
+    new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+    f = open(output_path, "a", newline="", encoding="utf-8")
+    writer = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS)
+    if new_file:
+        writer.writeheader()
+    return f, writer
+
+
+def run_batch(service, corpus_name, questions, output_path, batch_size=256, concurrency=4, use_cache=False):
+    """Answers questions chunk by chunk: one embedding call and one multi-query FAISS search
+    per chunk, then LLM calls on a bounded thread pool, writing each answer as it completes.
+    The semantic answer cache is bypassed unless use_cache is set, so a question never gets
+    the answer to a similar one."""
+    corpus = service.corpus(corpus_name)
+    answered = compact_output(output_path)
+    pending = [(row_id, question) for row_id, question in questions if row_id not in answered]
+    logger.info("%d questions, %d already answered, %d to go", len(questions),
+                len(questions) - len(pending), len(pending))
+
+    f, writer = open_output(output_path)
+    done = failed = 0
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                vectors = service.embeddings.embed_queries([question for _, question in chunk])
+                results = service.search_by_vectors(corpus_name, vectors, corpus.k * 2)
+
+                futures = {
+                    pool.submit(with_backoff, lambda q=question, v=vector, h=hits: service.answer(
+                        corpus_name, q, v, h, use_cache=use_cache)):
+                        (row_id, question)
+                    for (row_id, question), vector, hits in zip(chunk, vectors, results)
+                }
+                for future in as_completed(futures):
+                    row_id, question = futures[future]
+                    try:
+                        writer.writerow({"id": row_id, "question": question, "answer": future.result(), "error": ""})
+                        done += 1
+                    except Exception as e:
+                        logger.error("Question %s failed: %s", row_id, e)
+                        writer.writerow({"id": row_id, "question": question, "answer": "", "error": str(e)})
+                        failed += 1
+                    f.flush()
+
+                logger.info("%d/%d answered (%d failed), %.1f questions/min", done, len(pending), failed,
+                            done / max(time.perf_counter() - started, 1e-9) * 60)
+    finally:
+        f.close()
+    return done, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a CSV of questions against one of the app corpora.")
+    parser.add_argument("--corpus", required=True, choices=sorted(CORPORA))
+    parser.add_argument("--input", required=True, help="CSV with one question per row")
+    parser.add_argument("--output", required=True, help="answers CSV; rerun with the same file to resume")
+    parser.add_argument("--question-column", default="Question")
+    parser.add_argument("--id-column", default=None, help="column with a stable row id (default: row number)")
+    parser.add_argument("--batch-size", type=int, default=256, help="questions embedded and searched together")
+    parser.add_argument("--concurrency", type=int, default=4, help="LLM calls in flight")
+    parser.add_argument("--embeddings", default="openai", help="embeddings backend: openai, local or hashing")
+    parser.add_argument("--index-type", default="flat", help="FAISS index type, see ragcore/index_types.py")
+    parser.add_argument("--use-answer-cache", action="store_true",
+                        help="reuse answers of near-identical questions (off by default, e.g. for evaluation sets)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service = RetrievalService(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        embeddings_config={"backend": args.embeddings},
+        index_config={"type": args.index_type},
+    )
+    questions = read_questions(args.input, args.question_column, args.id_column)
+    done, failed = run_batch(service, args.corpus, questions, args.output, args.batch_size, args.concurrency,
+                             args.use_answer_cache)
+    print(f"{done} answered, {failed} failed. Answers in {args.output}")
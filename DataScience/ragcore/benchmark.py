@@ -0,0 +1,184 @@
+"""Retrieval benchmark over the app corpora.
+
+Each CSV row is indexed without its Question field, and the held-out question is used as the
+query; recall@k is the share of questions whose source row is among the top k results.
+Run from the DataScience/ folder, e.g.
+
+    python -m ragcore.benchmark --backends hashing --index-types flat,ivf,hnsw --output report.json
+"""
+import argparse
+import csv
+import json
+import logging
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from ragcore.corpora import CORPORA
+from ragcore.embeddings import get_embeddings
+from ragcore.index_types import build_faiss_index, factory_string, index_size_bytes, normalise_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_TYPES = ["flat", "sq8", "ivf", "ivf_sq8", "ivf_pq", "hnsw", "hnsw_sq8"]
+
+
+def load_holdout(csv_path, max_queries=None, seed=1):
+    """Returns (documents, queries, query_rows): row text without the question, and the
+    questions to search with alongside the row each one came from."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    documents = [
+        "\n".join(f"{key.strip()}: {value.strip()}" for key, value in row.items() if key != "Question")
+        for row in rows
+    ]
+    query_rows = np.arange(len(rows))
+    if max_queries and max_queries < len(rows):
+        query_rows = np.sort(np.random.default_rng(seed).choice(len(rows), max_queries, replace=False))
+    queries = [rows[i]["Question"] for i in query_rows]
+    return documents, queries, query_rows
+
+
+def percentile_ms(timings, q):
+    return round(float(np.percentile(timings, q)) * 1000, 4)
+
+
+def recall_at(indices, query_rows, k):
+    return round(float(np.mean([row in hits[:k] for row, hits in zip(query_rows, indices)])), 4)
+
+
+def embed(embeddings, documents, queries):
+    started = time.perf_counter()
+    doc_vectors = np.asarray(embeddings.embed_documents(documents), dtype=np.float32)
+    doc_seconds = time.perf_counter() - started
+
+    query_vectors, query_timings = [], []
+    for query in queries:
+        started = time.perf_counter()
+        # bypass the query cache so the timing is the real embedding cost
+        query_vectors.append(embeddings.backend.embed_query(query))
+        query_timings.append(time.perf_counter() - started)
+    return doc_vectors, np.asarray(query_vectors, dtype=np.float32), {
+        "document_embed_seconds": round(doc_seconds, 3),
+        "query_embed_p50_ms": percentile_ms(query_timings, 50),
+        "query_embed_p99_ms": percentile_ms(query_timings, 99),
+    }
+
+
+def bench_index(doc_vectors, query_vectors, query_rows, index_config, k):
+    started = time.perf_counter()
+    index = build_faiss_index(doc_vectors, index_config)
+    build_seconds = time.perf_counter() - started
+
+    timings, indices = [], []
+    for query in query_vectors:
+        started = time.perf_counter()
+        _, hits = index.search(query[None, :], k)
+        timings.append(time.perf_counter() - started)
+        indices.append(hits[0])
+
+    started = time.perf_counter()
+    index.search(query_vectors, k)
+    batch_seconds = time.perf_counter() - started
+
+    result = {
+        "index": normalise_config(index_config),
+        "factory": factory_string(index_config, doc_vectors.shape[1], len(doc_vectors)),
+        "build_seconds": round(build_seconds, 4),
+        "index_bytes": index_size_bytes(index),
+        "search_p50_ms": percentile_ms(timings, 50),
+        "search_p99_ms": percentile_ms(timings, 99),
+        "batch_search_qps": round(len(query_vectors) / batch_seconds, 1) if batch_seconds else None,
+    }
+    for at in sorted({1, k}):
+        result[f"recall@{at}"] = recall_at(indices, query_rows, at)
+    return result
+
+
+def run_benchmark(corpus_names, backends, index_types, k=3, max_queries=None, api_key=None, nprobe=8,
+                  ef_search=64):
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "k": k,
+        "results": [],
+    }
+    for corpus_name in corpus_names:
+        documents, queries, query_rows = load_holdout(CORPORA[corpus_name].csv_path, max_queries)
+        for backend in backends:
+            embeddings = get_embeddings({"backend": backend}, api_key=api_key)
+            doc_vectors, query_vectors, embed_stats = embed(embeddings, documents, queries)
+            for index_type in index_types:
+                index_config = {"type": index_type}
+                if index_type.startswith("ivf"):
+                    index_config["nprobe"] = nprobe
+                if index_type.startswith("hnsw"):
+                    index_config["ef_search"] = ef_search
+                result = bench_index(doc_vectors, query_vectors, query_rows, index_config, k)
+                result.update(
+                    corpus=corpus_name,
+                    num_documents=len(documents),
+                    num_queries=len(queries),
+                    embeddings=embeddings.model,
+                    **embed_stats,
+                )
+                logger.info(
+                    "%s / %s / %s: recall@%d %.3f, p50 %.3fms, %d bytes",
+                    corpus_name, embeddings.model, index_type, k, result[f"recall@{k}"],
+                    result["search_p50_ms"], result["index_bytes"],
+                )
+                report["results"].append(result)
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_table(report):
+    k = report["k"]
+    print(f"{'corpus':<14}{'embeddings':<26}{'index':<10}{'recall@' + str(k):>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'build s':>10}{'MB':>9}")
+    for r in report["results"]:
+        print(f"{r['corpus']:<14}{r['embeddings'][:25]:<26}{r['index']['type']:<10}{r[f'recall@{k}']:>10.3f}"
+              f"{r['search_p50_ms']:>10.3f}{r['search_p99_ms']:>10.3f}{r['build_seconds']:>10.3f}"
+              f"{r['index_bytes'] / 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark retrieval recall and latency on the app corpora.")
+    parser.add_argument("--corpora", default=",".join(CORPORA), help="comma separated corpus names")
+    parser.add_argument("--backends", default="hashing",
+                        help="comma separated embeddings backends (hashing runs offline and is deterministic)")
+    parser.add_argument("--index-types", default=",".join(DEFAULT_INDEX_TYPES))
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF lists scanned per query")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW candidate list size per query")
+    parser.add_argument("--max-queries", type=int, default=None, help="sample this many held-out questions")
+    parser.add_argument("--api-key", default=None, help="OpenAI key, only needed for --backends openai")
+    parser.add_argument("--output", default="benchmark_report.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = run_benchmark(
+        corpus_names=args.corpora.split(","),
+        backends=args.backends.split(","),
+        index_types=args.index_types.split(","),
+        k=args.k,
+        max_queries=args.max_queries,
+        api_key=args.api_key,
+        nprobe=args.nprobe,
+        ef_search=args.ef_search,
+    )
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    _print_table(report)
+    print(f"Report written to {args.output}")
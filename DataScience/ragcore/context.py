@@ -0,0 +1,115 @@
+import re
+from functools import lru_cache
+
+FIELD_LABELS = {"Question": "Q", "Answer": "A", "BookTitle": "Book"}
+# Columns of the corpus CSVs; any other "Key: value" line is part of a multi-line value
+ROW_COLUMNS = ("Question", "Answer", "BookTitle", "TopicInsights")
+PASSAGE_SEPARATOR = "\n\n"
+
+
+@lru_cache(maxsize=8)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # the BPE files are downloaded on first use, which fails in air-gapped environments
+        return None
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    encoding = _encoding(model)
+    if encoding is None:
+        # rough fallback when tiktoken is not available
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text, max_tokens, model="gpt-3.5-turbo"):
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is None:
+        trimmed = text[:max_tokens * 4]
+    else:
+        trimmed = encoding.decode(encoding.encode(text)[:max_tokens])
+    # end on a sentence or word boundary rather than mid-word
+    cut = max(trimmed.rfind(". "), trimmed.rfind("\n"))
+    if cut < len(trimmed) // 2:
+        cut = trimmed.rfind(" ")
+    return (trimmed[:cut + 1] if cut > 0 else trimmed).rstrip() + " ..."
+
+
+def compact_passage(page_content, fields=("Question", "Answer"), columns=ROW_COLUMNS):
+    """Turns CSVLoader text ("Question: ...\\nAnswer: ...") into short labelled lines,
+    keeping only the given fields.
+
+    CSVLoader writes one "Column: value" line per column, so a value containing newlines
+    spills onto lines without a column prefix; those stay with the field above them.
+    """
+    known = set(columns) | set(fields)
+    values = []
+    for line in page_content.splitlines():
+        key, sep, value = line.partition(": ")
+        if sep and key.strip() in known:
+            values.append((key.strip(), [value.strip()]))
+        elif values and line.strip():
+            values[-1][1].append(line.strip())
+
+    lines = []
+    for key, parts in values:
+        value = "\n".join(part for part in parts if part)
+        if key in fields and value:
+            lines.append(f"{FIELD_LABELS.get(key, key)}: {value}")
+    return "\n".join(lines) or page_content.strip()
+
+
+def _words(text):
+    return set(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+def _is_duplicate(words, packed_words, threshold):
+    for other in packed_words:
+        union = len(words | other)
+        if union and len(words & other) / union >= threshold:
+            return True
+    return False
+
+
+def pack_context(hits, budget_tokens=1000, max_passages=3, fields=("Question", "Answer"),
+                 model="gpt-3.5-turbo", dedupe_threshold=0.8, min_passage_tokens=40):
+    """Packs retrieved passages into at most budget_tokens, best match first.
+
+    hits are (document, distance) pairs from the L2 index, so lower distances rank first.
+    Passages that mostly repeat an already packed one are skipped, and the last passage
+    is trimmed to fit the budget. Returns the packed text and the number of tokens it uses.
+    """
+    packed, packed_words, used = [], [], 0
+    for doc, _ in sorted(hits, key=lambda hit: hit[1]):
+        if len(packed) >= max_passages:
+            break
+        text = compact_passage(doc.page_content, fields)
+        words = _words(text)
+        if _is_duplicate(words, packed_words, dedupe_threshold):
+            continue
+
+        separator = count_tokens(PASSAGE_SEPARATOR, model) if packed else 0
+        remaining = budget_tokens - used - separator
+        tokens = count_tokens(text, model)
+        if tokens > remaining:
+            if remaining < min_passage_tokens:
+                break
+            # leave room for the " ..." marker added to trimmed passages
+            text = truncate_to_tokens(text, remaining - 2, model)
+            tokens = count_tokens(text, model)
+
+        packed.append(text)
+        packed_words.append(words)
+        used += tokens + separator
+    return PASSAGE_SEPARATOR.join(packed), used
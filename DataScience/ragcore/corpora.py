@@ -0,0 +1,75 @@
+import os
+from dataclasses import dataclass, field
+
+DATA_SCIENCE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+@dataclass
+class Corpus:
+    """A named Q&A corpus served by the retrieval service, with the prompt and LLM it answers with."""
+
+    name: str
+    csv_path: str
+    template: str
+    llm_model: str
+    temperature: float = 0
+    k: int = 3
+    index_config: dict = field(default_factory=dict)
+    # past_answers packing: token budget and the CSV fields kept from each retrieved row
+    context_budget: int = 1000
+    context_fields: tuple = ("Question", "Answer")
+
+
+HUNGER_GAMES_TEMPLATE = """
+You are an expert on "The Hunger Games".
+
+Below is a question about the book:
+{question}
+
+Based on the knowledge from the book and similar past questions and answers, provide a detailed and accurate answer:
+{past_answers}
+
+Here is the best answer to the question:
+"""
+
+# Revised Prompt Template
+EXECUTHRIVE_TEMPLATE = """
+As an executive management coach utilizing advanced AI tools, you are tasked to answer the following business-related question: {question}
+
+Your response should be informed by a blend of your extensive knowledge in business literature and the insights drawn from similar past queries. For each step in crafting your response, consider the following guidelines:
+
+1/ Utilize the insights derived from similar past queries provided by the AI-driven similarity search. Reflect on these insights to ensure your response is well-informed and contextually relevant from {past_answers}.
+
+2/ If the current query extends beyond the scope of these past insights, expand your response using general business principles and theories. Clearly indicate which parts of your response are based on these broader principles.
+
+3/ Continuously evaluate if additional searches are needed to enhance the quality of your response. If so, integrate new findings seamlessly into your existing knowledge base.
+
+4/ Ensure that your response is factual and data-driven, drawing upon the specific examples or teachings from past insights and general business knowledge.
+
+5/ In cases where new searches have been conducted, include a brief summary of these additional insights, demonstrating how they contribute to the comprehensiveness of your response.
+
+6/ In your final output, you should summarise the response to four to five paragraphs, and NOT mention that there was a search history.
+
+7/ In your final output, you should summarise the response to four to five paragraphs.
+
+Here is your well-researched, comprehensive, and contextually relevant answer to the question:
+"""
+
+HUNGER_GAMES = Corpus(
+    name="hunger_games",
+    csv_path=os.path.join(DATA_SCIENCE_DIR, "HungerGamesExpert", "training_data.csv"),
+    template=HUNGER_GAMES_TEMPLATE,
+    llm_model="gpt-3.5-turbo-16k-0613",
+    temperature=0,
+)
+
+EXECUTHRIVE = Corpus(
+    name="executhrive",
+    csv_path=os.path.join(DATA_SCIENCE_DIR, "ExecuThrive", "books_qna.csv"),
+    template=EXECUTHRIVE_TEMPLATE,
+    llm_model="gpt-4-1106-preview",  # gpt-3.5-turbo-16k-0613
+    temperature=0.9,
+    context_fields=("Question", "Answer", "BookTitle"),
+)
+
+CORPORA = {corpus.name: corpus for corpus in (HUNGER_GAMES, EXECUTHRIVE)}
@@ -0,0 +1,81 @@
+import hashlib
+import sqlite3
+
+import numpy as np
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite store of document embeddings keyed by (row text hash, embedding model)."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                text_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (text_hash, model)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, hashes, model):
+        found = {}
+        hashes = list(hashes)
+        # stay below SQLite's limit on bound parameters
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *batch],
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items, model):
+        rows = []
+        for key, vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((key, model, vector.shape[0], vector.tobytes()))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (text_hash, model, dim, vector) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_many(self, hashes, model):
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM embeddings WHERE model = ? AND text_hash = ?",
+                [(model, key) for key in hashes],
+            )
+
+    def embed_missing(self, texts_by_hash, embeddings, model, batch_size=1000):
+        """Returns vectors for every hash, calling the embedding model only for hashes not yet cached.
+
+        Each batch is written to the cache as soon as it is embedded, so an interrupted
+        sync keeps the work it already paid for.
+        """
+        vectors = self.get_many(texts_by_hash.keys(), model)
+        missing = [key for key in texts_by_hash if key not in vectors]
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            embedded = embeddings.embed_documents([texts_by_hash[key] for key in batch])
+            self.put_many(zip(batch, embedded), model)
+            vectors.update(
+                (key, np.asarray(vector, dtype=np.float32)) for key, vector in zip(batch, embedded)
+            )
+        return vectors, len(missing)
+
+    def close(self):
+        self._conn.close()
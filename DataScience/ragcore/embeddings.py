@@ -0,0 +1,173 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+DEFAULT_LOCAL_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings built with signed feature hashing.
+
+    Needs no model download or network access, so it is the backend for air-gapped runs
+    and offline benchmarks. Unigrams and bigrams are hashed into `dim` buckets and each
+    batch is encoded as one NumPy scatter-add.
+    """
+
+    def __init__(self, dim=384, batch_size=1024):
+        self.dim = dim
+        self.batch_size = batch_size
+        self.model = f"hashing-{dim}"
+
+    @staticmethod
+    @lru_cache(maxsize=1 << 16)
+    def _bucket(token, dim):
+        value = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        return value % dim, 1.0 if (value >> 63) & 1 else -1.0
+
+    def _features(self, text):
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                col, sign = self._bucket(feature, self.dim)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+        np.add.at(vectors, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)),
+                  np.array(signs, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def embed_documents(self, texts):
+        out = []
+        for start in range(0, len(texts), self.batch_size):
+            out.extend(self.encode(texts[start:start + self.batch_size]).tolist())
+        return out
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+
+class TransformerEmbeddings(Embeddings):
+    """Sentence embeddings from a local Hugging Face model on CPU.
+
+    Texts are sorted by length and encoded in padded batches with mean pooling, which keeps
+    padding waste low. Point model_name at a local directory (or set local_files_only) to
+    run without network access.
+    """
+
+    def __init__(self, model_name=DEFAULT_LOCAL_MODEL, batch_size=64, max_length=256,
+                 local_files_only=False):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self._torch = torch
+        self.model = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self._tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=local_files_only)
+        self._model = AutoModel.from_pretrained(model_name, local_files_only=local_files_only)
+        self._model.eval()
+
+    def encode(self, texts):
+        torch = self._torch
+        order = np.argsort([len(text) for text in texts])
+        vectors = [None] * len(texts)
+        with torch.inference_mode():
+            for start in range(0, len(texts), self.batch_size):
+                batch_idx = order[start:start + self.batch_size]
+                batch = self._tokenizer(
+                    [texts[i] for i in batch_idx], padding=True, truncation=True,
+                    max_length=self.max_length, return_tensors="pt",
+                )
+                hidden = self._model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+                for i, vector in zip(batch_idx, pooled.numpy()):
+                    vectors[i] = vector
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts):
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Wraps an embeddings backend with an in-process LRU cache for query embeddings."""
+
+    def __init__(self, backend, max_entries=1024):
+        self.backend = backend
+        self.model = getattr(backend, "model", None) or type(backend).__name__
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        return self.backend.embed_documents(texts)
+
+    def embed_query(self, text):
+        with self._lock:
+            if text in self._cache:
+                self._cache.move_to_end(text)
+                return self._cache[text]
+        vector = self.backend.embed_query(text)
+        self._remember([(text, vector)])
+        return vector
+
+    def embed_queries(self, texts):
+        """Embeds several queries, sending all cache misses to the backend in one batch."""
+        with self._lock:
+            found = {text: self._cache[text] for text in texts if text in self._cache}
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        if missing:
+            vectors = self.backend.embed_documents(missing)
+            found.update(zip(missing, vectors))
+            self._remember(zip(missing, vectors))
+        return [found[text] for text in texts]
+
+    def _remember(self, items):
+        with self._lock:
+            for text, vector in items:
+                self._cache[text] = vector
+                self._cache.move_to_end(text)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+
+def get_embeddings(config=None, api_key=None):
+    """Builds the embeddings backend named by config["backend"]: "openai" (default), "local" or "hashing"."""
+    config = dict(config or {})
+    backend = config.get("backend", "openai")
+
+    if backend == "openai":
+        from langchain.embeddings.openai import OpenAIEmbeddings
+
+        kwargs = {"openai_api_key": api_key}
+        if "model" in config:
+            kwargs["model"] = config["model"]
+        embeddings = OpenAIEmbeddings(**kwargs)
+    elif backend == "local":
+        embeddings = TransformerEmbeddings(
+            model_name=config.get("model", DEFAULT_LOCAL_MODEL),
+            batch_size=int(config.get("batch_size", 64)),
+            local_files_only=bool(config.get("local_files_only", False)),
+        )
+    elif backend == "hashing":
+        embeddings = HashingEmbeddings(dim=int(config.get("dim", 384)))
+    else:
+        raise ValueError(f"Unknown embeddings backend: {backend!r}")
+
+    return CachedQueryEmbeddings(embeddings, max_entries=int(config.get("query_cache_size", 1024)))
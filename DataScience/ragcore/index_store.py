@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import faiss
+import numpy as np
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.document_loaders.csv_loader import CSVLoader
+from langchain.vectorstores import FAISS
+
+from ragcore.embedding_cache import EmbeddingCache, text_hash
+from ragcore.index_types import (
+    apply_search_params,
+    build_faiss_index,
+    build_key,
+    index_size_bytes,
+    normalise_config,
+    probe_latency,
+    supports_removal,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+MANIFEST_FILE = "manifest.json"
+EMBEDDING_CACHE_FILE = "embeddings.sqlite"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def embedding_model_name(embeddings):
+    return (
+        getattr(embeddings, "model", None)
+        or getattr(embeddings, "model_name", None)
+        or type(embeddings).__name__
+    )
+
+
+def index_key(csv_path, model_name, index_config=None):
+    name = f"{os.path.basename(csv_path)}:{model_name}:{build_key(index_config)}"
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()[:16]
+
+
+def default_index_dir(csv_path):
+    return os.path.join(os.path.dirname(os.path.realpath(csv_path)), ".faiss_index")
+
+
+def load_index(folder, embeddings, mmap=True, index_config=None):
+    index_path = os.path.join(folder, INDEX_FILE)
+    index = None
+    if mmap:
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+        except RuntimeError:
+            # not every index type can be memory mapped, fall back to a normal read
+            index = None
+    if index is None:
+        index = faiss.read_index(index_path)
+
+    # search breadth (nprobe / efSearch) is not stored in the index, so it is applied on every load
+    apply_search_params(index, index_config)
+
+    with open(os.path.join(folder, DOCSTORE_FILE), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def save_index(db, folder, manifest):
+    """Writes the index to a temporary folder first so readers never see a half-written index."""
+    parent = os.path.dirname(folder)
+    os.makedirs(parent, exist_ok=True)
+    tmp_folder = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        db.save_local(tmp_folder)
+        with open(os.path.join(tmp_folder, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+        os.replace(tmp_folder, folder)
+    finally:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+
+
+def read_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_csv_documents(csv_path):
+    """Loads the CSV rows keyed by the hash of their text. Exact duplicate rows are kept once."""
+    documents = {}
+    for doc in CSVLoader(file_path=csv_path).load():
+        documents.setdefault(text_hash(doc.page_content), doc)
+    return documents
+
+
+def build_store(documents, vectors, embeddings, index_config=None):
+    """Builds a FAISS store over every document, training the configured index type."""
+    ids = list(documents)
+    matrix = np.vstack([vectors[key] for key in ids]).astype(np.float32)
+    index = build_faiss_index(matrix, index_config)
+    docstore = InMemoryDocstore({key: documents[key] for key in ids})
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
+
+
+def sync_index(csv_path, embeddings, cache, db=None, index_config=None):
+    """Brings db in line with the CSV: embeds only rows missing from the embedding cache,
+    removes rows that are no longer in the CSV and adds new ones in place."""
+    model_name = embedding_model_name(embeddings)
+    documents = load_csv_documents(csv_path)
+
+    existing = set(db.index_to_docstore_id.values()) if db is not None else set()
+    removed = [key for key in existing if key not in documents]
+    added = [key for key in documents if key not in existing]
+
+    vectors, embedded = cache.embed_missing(
+        {key: documents[key].page_content for key in added}, embeddings, model_name
+    )
+    if removed:
+        cache.delete_many(removed, model_name)
+
+    if db is None or (removed and not supports_removal(index_config)):
+        # rebuilding costs no embedding calls, every vector is already in the cache
+        vectors.update(cache.get_many([key for key in documents if key not in vectors], model_name))
+        db = build_store(documents, vectors, embeddings, index_config)
+    else:
+        if removed:
+            db.delete(removed)
+        if added:
+            text_embeddings = [(documents[key].page_content, vectors[key].tolist()) for key in added]
+            metadatas = [documents[key].metadata for key in added]
+            db.add_embeddings(text_embeddings, metadatas=metadatas, ids=added)
+
+    logger.info(
+        "Synced %s: %d rows added (%d newly embedded), %d removed, %d unchanged",
+        os.path.basename(csv_path), len(added), embedded, len(removed),
+        len(documents) - len(added),
+    )
+    return db, len(documents)
+
+
+def load_or_build_index(csv_path, embeddings, index_dir=None, index_config=None):
+    """Loads the FAISS index for csv_path from disk. When the CSV has changed since the index
+    was saved, only the changed rows are embedded and the saved index is updated in place.
+
+    index_config picks the index type ("flat", "sq8", "ivf", "ivf_sq8", "ivf_pq", "hnsw",
+    "hnsw_sq8") and its parameters; see ragcore/index_types.py."""
+    index_config = normalise_config(index_config)
+    index_dir = index_dir or default_index_dir(csv_path)
+    csv_hash = file_sha256(csv_path)
+    model_name = embedding_model_name(embeddings)
+    folder = os.path.join(index_dir, index_key(csv_path, model_name, index_config))
+
+    manifest = read_manifest(folder)
+    has_index = os.path.exists(os.path.join(folder, INDEX_FILE))
+    if has_index and manifest and manifest.get("csv_sha256") == csv_hash:
+        return load_index(folder, embeddings, index_config=index_config)
+
+    os.makedirs(index_dir, exist_ok=True)
+    cache = EmbeddingCache(os.path.join(index_dir, EMBEDDING_CACHE_FILE))
+    try:
+        # the index is modified below, so it is read into memory rather than memory mapped
+        db = load_index(folder, embeddings, mmap=False, index_config=index_config) if has_index else None
+        started = time.perf_counter()
+        db, num_documents = sync_index(csv_path, embeddings, cache, db, index_config)
+        build_seconds = time.perf_counter() - started
+    finally:
+        cache.close()
+
+    stats = {"build_seconds": round(build_seconds, 3), "index_bytes": index_size_bytes(db.index)}
+    stats.update(probe_latency(db.index))
+    logger.info("Index %s for %s: %s", index_config["type"], os.path.basename(csv_path), stats)
+
+    save_index(db, folder, {
+        "csv_path": os.path.basename(csv_path),
+        "csv_sha256": csv_hash,
+        "embedding_model": model_name,
+        "num_documents": num_documents,
+        "index": index_config,
+        "stats": stats,
+    })
+    return db
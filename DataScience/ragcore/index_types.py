@@ -0,0 +1,135 @@
+import math
+import time
+
+import faiss
+import numpy as np
+
+# Parameters that change the index contents; anything else (search breadth) is applied at load time
+BUILD_PARAMS = {
+    "flat": (),
+    "sq8": (),
+    "ivf": ("nlist",),
+    "ivf_sq8": ("nlist",),
+    "ivf_pq": ("nlist", "pq_m", "pq_nbits"),
+    "hnsw": ("hnsw_m", "ef_construction"),
+    "hnsw_sq8": ("hnsw_m", "ef_construction"),
+}
+
+DEFAULT_INDEX_CONFIG = {"type": "flat"}
+
+# Search breadth per index family; FAISS's own HNSW default (efSearch=16) costs a lot of recall
+SEARCH_DEFAULTS = {
+    "ivf": {"nprobe": 8},
+    "hnsw": {"ef_search": 64},
+}
+
+
+def normalise_config(config):
+    config = dict(DEFAULT_INDEX_CONFIG, **(config or {}))
+    if config["type"] not in BUILD_PARAMS:
+        raise ValueError(f"Unknown index type {config['type']!r}, expected one of {sorted(BUILD_PARAMS)}")
+    for name, value in SEARCH_DEFAULTS.get(config["type"].split("_")[0], {}).items():
+        config.setdefault(name, value)
+    return config
+
+
+def build_key(config):
+    """The part of the config that decides the saved index, used in its folder name."""
+    config = normalise_config(config)
+    params = ",".join(f"{name}={config[name]}" for name in BUILD_PARAMS[config["type"]] if name in config)
+    return f"{config['type']}({params})"
+
+
+def supports_removal(config):
+    # Only flat indexes renumber their ids after remove_ids the way langchain's FAISS.delete
+    # expects. HNSW graphs cannot drop vectors at all, and IVF lists keep the original ids, so
+    # those indexes are rebuilt from cached vectors instead
+    return normalise_config(config)["type"] in ("flat", "sq8")
+
+
+def _nlist(config, num_vectors):
+    # ~4*sqrt(n) lists by default, and never more than n / 39 so every centroid gets trained
+    nlist = int(config.get("nlist") or 4 * math.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // 39))
+
+
+def _pq_m(config, dim):
+    m = int(config.get("pq_m") or max(1, dim // 8))
+    while dim % m:
+        m -= 1
+    return m
+
+
+def factory_string(config, dim, num_vectors):
+    config = normalise_config(config)
+    kind = config["type"]
+    if kind == "flat":
+        return "Flat"
+    if kind == "sq8":
+        return "SQ8"
+    if kind.startswith("hnsw"):
+        spec = f"HNSW{int(config.get('hnsw_m', 32))}"
+        return spec + "_SQ8" if kind == "hnsw_sq8" else spec
+
+    nlist = _nlist(config, num_vectors)
+    if kind == "ivf":
+        return f"IVF{nlist},Flat"
+    if kind == "ivf_sq8":
+        return f"IVF{nlist},SQ8"
+    # each PQ codebook has 2**nbits centroids; shrink it on small corpora like nlist above
+    nbits = int(config.get("pq_nbits", 8))
+    nbits = max(1, min(nbits, int(math.log2(max(num_vectors // 39, 2)))))
+    return f"IVF{nlist},PQ{_pq_m(config, dim)}x{nbits}"
+
+
+def apply_search_params(index, config):
+    config = normalise_config(config)
+    params = faiss.ParameterSpace()
+    if config["type"].startswith("ivf"):
+        params.set_index_parameter(index, "nprobe", int(config["nprobe"]))
+    if config["type"].startswith("hnsw"):
+        params.set_index_parameter(index, "efSearch", int(config["ef_search"]))
+    return index
+
+
+def build_faiss_index(vectors, config, max_training_points=100_000, seed=1):
+    """Builds and trains the configured index type over vectors (an (n, dim) float32 array)."""
+    config = normalise_config(config)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(config, dim, num_vectors), faiss.METRIC_L2)
+
+    if config["type"].startswith("hnsw"):
+        index.hnsw.efConstruction = int(config.get("ef_construction", 80))
+
+    if not index.is_trained:
+        training = vectors
+        if num_vectors > max_training_points:
+            rng = np.random.default_rng(seed)
+            training = vectors[rng.choice(num_vectors, max_training_points, replace=False)]
+        index.train(training)
+
+    index.add(vectors)
+    return apply_search_params(index, config)
+
+
+def index_size_bytes(index):
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def probe_latency(index, k=3, num_queries=100, seed=1):
+    """Median and p99 single-query search latency in milliseconds, using random unit queries."""
+    if index.ntotal == 0:
+        return {"p50_ms": None, "p99_ms": None}
+    rng = np.random.default_rng(seed)
+    queries = rng.standard_normal((num_queries, index.d)).astype(np.float32)
+    faiss.normalize_L2(queries)
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query[None, :], k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "p99_ms": round(float(np.percentile(timings, 99)), 4),
+    }
@@ -0,0 +1,459 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ragcore.corpora import CORPORA
+from ragcore.startup import STARTUP, run_in_background
+
+# numpy, faiss, langchain and the embedding backends are imported on first use, so importing
+# this module (and rendering the app page) stays fast
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalBatcher:
+    """Collects retrieval requests arriving from concurrent sessions for up to `window` seconds,
+    embeds them in one call and runs one multi-query FAISS search per corpus."""
+
+    def __init__(self, service, window=0.01, max_batch=64):
+        self.service = service
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="retrieval-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, corpus_name, question, k):
+        future = Future()
+        self._queue.put((corpus_name, question, k, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        questions = [question for _, question, _, _ in batch]
+        try:
+            vectors = self.service.embeddings.embed_queries(questions)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][3].set_exception(e)
+                return
+            # one bad request must not fail the others in its window: embed them one by one
+            vectors = []
+            for request in batch:
+                try:
+                    vectors.append(self.service.embeddings.embed_queries([request[1]])[0])
+                except Exception as e:
+                    request[3].set_exception(e)
+                    vectors.append(None)
+
+        by_corpus = {}
+        for request, vector in zip(batch, vectors):
+            if vector is not None:
+                by_corpus.setdefault(request[0], []).append((request, vector))
+
+        for corpus_name, requests in by_corpus.items():
+            try:
+                self._search(corpus_name, requests)
+            except Exception as e:
+                if len(requests) == 1:
+                    requests[0][0][3].set_exception(e)
+                    continue
+                for request in requests:
+                    try:
+                        self._search(corpus_name, [request])
+                    except Exception as e:
+                        request[0][3].set_exception(e)
+
+    def _search(self, corpus_name, requests):
+        k = max(request[2] for request, _ in requests)
+        results = self.service.search_by_vectors(corpus_name, [vector for _, vector in requests], k)
+        for (request, vector), hits in zip(requests, results):
+            request[3].set_result((vector, hits[:request[2]]))
+
+
+class RetrievalService:
+    """Serves several named corpora from one process.
+
+    The embedding model, the OpenAI client, the LLM objects and the semantic answer cache
+    are shared by every corpus and session. Each corpus's FAISS index is loaded once, on
+    first use.
+    """
+
+    def __init__(self, api_key=None, corpora=None, embeddings_config=None, index_config=None,
+                 answer_cache=None, batch_window=0.01, max_batch=64):
+        self.api_key = api_key
+        self.corpora = dict(corpora or CORPORA)
+        self.index_config = dict(index_config or {})
+        self.embeddings_config = embeddings_config
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._embeddings = None
+        self._answer_cache = answer_cache
+        self._batcher = None
+        self._stores = {}
+        self._chains = {}
+        self._llms = {}
+        self._warming = {}
+        self._openai_client = None
+        self._lock = threading.RLock()
+        self._store_locks = {name: threading.Lock() for name in self.corpora}
+
+    @property
+    def embeddings(self):
+        with self._lock:
+            if self._embeddings is None:
+                with STARTUP.phase("embeddings"):
+                    from ragcore.embeddings import get_embeddings
+
+                    self._embeddings = get_embeddings(self.embeddings_config, api_key=self.api_key)
+            return self._embeddings
+
+    @property
+    def answer_cache(self):
+        with self._lock:
+            if self._answer_cache is None:
+                from ragcore.answer_cache import SemanticAnswerCache
+
+                self._answer_cache = SemanticAnswerCache()
+            return self._answer_cache
+
+    @property
+    def batcher(self):
+        with self._lock:
+            if self._batcher is None:
+                self._batcher = RetrievalBatcher(self, window=self.batch_window, max_batch=self.max_batch)
+            return self._batcher
+
+    def corpus(self, name):
+        try:
+            return self.corpora[name]
+        except KeyError:
+            raise KeyError(f"Unknown corpus {name!r}, expected one of {sorted(self.corpora)}") from None
+
+    def store(self, name):
+        if name not in self._stores:
+            corpus = self.corpus(name)
+            with self._store_locks[name]:
+                if name not in self._stores:
+                    embeddings = self.embeddings
+                    with STARTUP.phase(f"index:{name}"):
+                        from ragcore.index_store import load_or_build_index
+
+                        index_config = dict(self.index_config, **corpus.index_config)
+                        self._stores[name] = load_or_build_index(
+                            corpus.csv_path, embeddings, index_config=index_config
+                        )
+        return self._stores[name]
+
+    def warm(self, name):
+        """Builds everything a first question needs: embeddings, the index, the LLM client and chain."""
+        self.store(name)
+        self.chain(name)
+        STARTUP.mark(f"ready:{name}")
+
+    def warm_async(self, name):
+        """Starts warm() on a background thread once per corpus and returns its Future."""
+        with self._lock:
+            if name not in self._warming:
+                future = run_in_background(self.warm, name, name=f"warm-{name}")
+                future.add_done_callback(
+                    lambda f: f.exception() and logger.error("Warming %s failed: %s", name, f.exception())
+                )
+                self._warming[name] = future
+            return self._warming[name]
+
+    def is_ready(self, name):
+        future = self._warming.get(name)
+        return name in self._stores and (future is None or future.done())
+
+    def llm(self, model, temperature):
+        with self._lock:
+            key = (model, temperature)
+            if key not in self._llms:
+                with STARTUP.phase(f"llm:{model}"):
+                    from langchain.chat_models import ChatOpenAI
+                    import openai
+
+                    if self._openai_client is None:
+                        self._openai_client = openai.OpenAI(api_key=self.api_key)
+                    self._llms[key] = ChatOpenAI(
+                        model=model,
+                        temperature=temperature,
+                        openai_api_key=self.api_key,
+                        streaming=True,
+                        client=self._openai_client.chat.completions,
+                    )
+            return self._llms[key]
+
+    def chain(self, name):
+        with self._lock:
+            if name not in self._chains:
+                corpus = self.corpus(name)
+                llm = self.llm(corpus.llm_model, corpus.temperature)
+                with STARTUP.phase(f"chain:{name}"):
+                    from langchain.chains import LLMChain
+                    from langchain.prompts import PromptTemplate
+
+                    prompt = PromptTemplate(input_variables=["question", "past_answers"], template=corpus.template)
+                    self._chains[name] = LLMChain(llm=llm, prompt=prompt)
+            return self._chains[name]
+
+    def search_by_vectors(self, name, vectors, k):
+        """Runs one FAISS search for all query vectors; returns [(document, distance), ...] per query."""
+        import numpy as np
+
+        db = self.store(name)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        distances, indices = db.index.search(matrix, k)
+        results = []
+        for row_distances, row_indices in zip(distances, indices):
+            hits = []
+            for distance, i in zip(row_distances, row_indices):
+                if i == -1:
+                    continue
+                hits.append((db.docstore.search(db.index_to_docstore_id[int(i)]), float(distance)))
+            results.append(hits)
+        return results
+
+    def retrieve_with_vector(self, name, question, k=None):
+        k = k or self.corpus(name).k
+        # load the index on the caller's thread, so a corpus that is still loading or
+        # rebuilding never holds up the batcher thread serving the other corpora
+        self.store(name)
+        return self.batcher.submit(name, question, k).result()
+
+    def retrieve(self, name, question, k=None):
+        _, hits = self.retrieve_with_vector(name, question, k)
+        return [doc.page_content for doc, _ in hits]
+
+    def pack_past_answers(self, name, question, hits):
+        """Dedupes, trims and packs the retrieved rows into the corpus's token budget."""
+        from ragcore.context import count_tokens, pack_context
+
+        corpus = self.corpus(name)
+        past_answers, context_tokens = pack_context(
+            hits,
+            budget_tokens=corpus.context_budget,
+            max_passages=corpus.k,
+            fields=corpus.context_fields,
+            model=corpus.llm_model,
+        )
+        prompt_tokens = count_tokens(
+            corpus.template.format(question=question, past_answers=past_answers), corpus.llm_model
+        )
+        # what the prompt used to cost: the raw list of the top k page_content strings
+        unpacked = [doc.page_content for doc, _ in hits[:corpus.k]]
+        unpacked_tokens = count_tokens(
+            corpus.template.format(question=question, past_answers=unpacked), corpus.llm_model
+        )
+        logger.info(
+            "[%s] prompt tokens %d (context %d of %d budget), unpacked prompt would be %d",
+            name, prompt_tokens, context_tokens, corpus.context_budget, unpacked_tokens,
+        )
+        return past_answers
+
+    def answer(self, name, question, query_vector, hits, handler=None, use_cache=True):
+        """Answers from the semantic cache when possible, otherwise prompts the LLM with the packed hits.
+        With use_cache=False the LLM is always asked and the answer is not cached."""
+        corpus = self.corpus(name)
+        cached_answer = self.answer_cache.lookup(name, query_vector, corpus.template) if use_cache else None
+        if cached_answer is not None:
+            if handler is not None:
+                handler.log(cached=True)
+            return cached_answer
+
+        past_answers = self.pack_past_answers(name, question, hits)
+        callbacks = [handler] if handler is not None else None
+        response = self.chain(name).run(question=question, past_answers=past_answers, callbacks=callbacks)
+        if handler is not None:
+            handler.log()
+        if use_cache:
+            self.answer_cache.store(name, query_vector, corpus.template, question, response)
+        return response
+
+    def generate(self, name, question, on_token=None):
+        from ragcore.streaming import StreamingLatencyHandler
+
+        corpus = self.corpus(name)
+        # tokens are forwarded to on_token as they arrive; latency is logged per query
+        handler = StreamingLatencyHandler(on_token=on_token, label=name)
+
+        # the question is embedded once and reused for both the answer cache and retrieval;
+        # extra candidates are fetched so duplicates dropped while packing can be replaced
+        query_vector, hits = self.retrieve_with_vector(name, question, k=corpus.k * 2)
+        return self.answer(name, question, query_vector, hits, handler)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service(**kwargs):
+    """Returns the process-wide RetrievalService, creating it on first call."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RetrievalService(**kwargs)
+        return _service
+
+
+class RemoteRetrievalService:
+    """Client for a RetrievalService running behind `python -m ragcore.service`."""
+
+    def __init__(self, url, timeout=300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def warm_async(self, name):
+        # the remote service loads its indexes when it starts
+        return None
+
+    def is_ready(self, name):
+        return True
+
+    def retrieve(self, name, question, k=None):
+        import requests
+
+        response = requests.post(f"{self.url}/retrieve", json={"corpus": name, "question": question, "k": k},
+                                 timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["passages"]
+
+    def generate(self, name, question, on_token=None):
+        import requests
+
+        answer = ""
+        with requests.post(f"{self.url}/answer", json={"corpus": name, "question": question},
+                           stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                message = json.loads(line)
+                if "error" in message:
+                    raise RuntimeError(message["error"])
+                if "token" in message:
+                    answer += message["token"]
+                    if on_token is not None:
+                        on_token(answer)
+                if "answer" in message:
+                    answer = message["answer"]
+        return answer
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """JSON API: GET /corpora, POST /retrieve and POST /answer (streams newline-delimited JSON)."""
+
+    service = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/corpora":
+            self._send_json(200, {"corpora": sorted(self.service.corpora)})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            request = self._read_json()
+            if not isinstance(request, dict):
+                raise TypeError("request body must be a JSON object")
+            name, question, k = request["corpus"], request["question"], request.get("k")
+            if not isinstance(question, str) or not question.strip():
+                raise ValueError("question must be a non-empty string")
+            if k is not None and (not isinstance(k, int) or isinstance(k, bool) or k < 1):
+                raise ValueError("k must be a positive integer")
+            self.service.corpus(name)
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        if self.path == "/retrieve":
+            try:
+                passages = self.service.retrieve(name, question, k)
+            except Exception as e:
+                logger.exception("Retrieval failed for corpus %s", name)
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, {"passages": passages})
+        elif self.path == "/answer":
+            self._stream_answer(name, question)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _stream_answer(self, name, question):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        sent = [0]
+
+        def write_line(payload):
+            self.wfile.write(json.dumps(payload).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+        def on_token(text):
+            write_line({"token": text[sent[0]:]})
+            sent[0] = len(text)
+
+        try:
+            write_line({"answer": self.service.generate(name, question, on_token=on_token)})
+        except Exception as e:
+            logger.exception("Answer failed for corpus %s", name)
+            write_line({"error": str(e)})
+
+
+def serve(service, host="127.0.0.1", port=8765):
+    handler = type("BoundServiceRequestHandler", (ServiceRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    logger.info("Retrieval service for %s listening on http://%s:%d", sorted(service.corpora), host, port)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Q&A corpora over a local HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--embeddings", default="openai", help="embeddings backend: openai, local or hashing")
+    parser.add_argument("--index-type", default="flat", help="FAISS index type, see ragcore/index_types.py")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service = RetrievalService(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        embeddings_config={"backend": args.embeddings},
+        index_config={"type": args.index_type},
+    )
+    # load every index up front so the first request does not pay for it
+    for corpus_name in service.corpora:
+        service.store(corpus_name)
+    serve(service, args.host, args.port)
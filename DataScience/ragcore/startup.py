@@ -0,0 +1,63 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# close enough to process start: ragcore.startup is the first ragcore module the apps import
+PROCESS_STARTED = time.perf_counter()
+
+
+class StartupTimer:
+    """Records how long each startup phase took the first time it ran in this process."""
+
+    def __init__(self):
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name, seconds, started):
+        with self._lock:
+            if name in self._phases:
+                return
+            self._phases[name] = {
+                "seconds": round(seconds, 4),
+                "started_at": round(started - PROCESS_STARTED, 4),
+            }
+        logger.info("Startup phase %r took %.3fs", name, seconds)
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter() - started, started)
+
+    def mark(self, name):
+        """Records a milestone as the time elapsed since the process started."""
+        now = time.perf_counter()
+        self._record(name, now - PROCESS_STARTED, PROCESS_STARTED)
+
+    def summary(self):
+        with self._lock:
+            return dict(sorted(self._phases.items(), key=lambda item: item[1]["started_at"]))
+
+
+STARTUP = StartupTimer()
+
+
+def run_in_background(fn, *args, name=None):
+    """Runs fn on a daemon thread and returns a Future for its result."""
+    from concurrent.futures import Future
+
+    future = Future()
+
+    def target():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, name=name, daemon=True).start()
+    return future
@@ -0,0 +1,56 @@
+import logging
+import time
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingLatencyHandler(BaseCallbackHandler):
+    """Forwards streamed LLM tokens to on_token and records time to first token and total latency.
+
+    The clock starts when the handler is created, so create it at the start of the query to
+    include retrieval time in both measurements.
+    """
+
+    def __init__(self, on_token=None, label="query"):
+        self.on_token = on_token
+        self.label = label
+        self.text = ""
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+
+    def on_llm_new_token(self, token, **kwargs):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.text += token
+        if self.on_token is not None:
+            self.on_token(self.text)
+
+    def on_llm_end(self, response, **kwargs):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def time_to_first_token(self):
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total_latency(self):
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def log(self, cached=False):
+        if cached:
+            logger.info("[%s] answered from cache in %.3fs", self.label, self.total_latency)
+            return
+        ttft = self.time_to_first_token
+        logger.info(
+            "[%s] time to first token %s, total latency %.2fs, %d chars",
+            self.label,
+            f"{ttft:.2f}s" if ttft is not None else "n/a",
+            self.total_latency,
+            len(self.text),
+        )